@@ -5,36 +5,126 @@ and serves a minimal frontend for collecting stops and visualising routes.
 """
 from __future__ import annotations
 
+import os
 import time
 import re
+import concurrent.futures
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-import io
+import struct
+import tempfile
 import zipfile
-import json
+import orjson
+import xxhash
+import numpy as np
 import requests
 import pandas as pd
+import xlsxwriter
 from flask import Flask, jsonify, request, send_file
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
+from requests.adapters import HTTPAdapter
 
 from solve_vrp import (
     Stop,
+    Stops,
     Vehicle,
     build_data_model,
-    get_routes,
-    solve_vrp,
+    haversine_m,
+    solve_and_extract,
     to_geojson,
     slugify,
     OSRM_BASE,
 )
 
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson so large route/geojson responses
+    serialize in C instead of the pure-Python stdlib encoder."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(
+            obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+
 app = Flask(__name__, static_folder="static", static_url_path="")
+app.json = OrjsonProvider(app)
+# Negotiated gzip/deflate for text bodies (solve JSON, /map/latest HTML)
+Compress(app)
+
+
+@dataclass(slots=True)
+class SolveBundle:
+    """Everything derived from the latest successful solve, cached as one
+    unit so export endpoints reuse precomputed results instead of
+    re-solving or re-formatting."""
+
+    key: int
+    routes: List[Any]
+    formatted_routes: Optional[List[Dict[str, Any]]]
+    data: Dict[str, Any]
+    geojson: Optional[Dict[str, Any]]
+    meta: Optional[Dict[str, Any]]
+    rows: Optional[List[tuple]] = None  # assignment table, xlsx column order
+    map_html: Optional[bytes] = None  # rendered lazily by /map/latest
+    color_map: Optional[Dict[str, str]] = None  # vehicle name -> palette color
 
 
-# Simple in-memory cache of the latest successful solve so export endpoints
-# can reuse matrices and routes without re-solving.
-_LAST_SOLVE: Optional[Dict[str, Any]] = None
+# Cache of the latest successful solve for reuse in export endpoints.
+_LAST_SOLVE: Optional[SolveBundle] = None
 _SHOPS_CACHE: Optional[List[Dict[str, Any]]] = None
 
+# Shared keep-alive session for all OSRM traffic from the web process.
+_HTTP = requests.Session()
+_HTTP.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+_HTTP.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+
+# The OR-Tools solve is CPU-bound and holds the GIL; run it on a process
+# pool so Flask workers stay responsive. Created lazily so plain imports
+# (and tooling) don't fork worker processes.
+_SOLVE_POOL: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+
+def _solve_pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _SOLVE_POOL
+    if _SOLVE_POOL is None:
+        _SOLVE_POOL = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _SOLVE_POOL
+
+# Prebound packers for _canonical_key so the per-stop/vehicle hash update
+# skips re-parsing the format string.
+_PACK_STOP = struct.Struct("<ddiiii").pack
+_PACK_VEHICLE = struct.Struct("<iiiid").pack
+
+# One depot + one delivery needs no OSRM matrix or CP-SAT run; set to
+# 0/false to force even trivial inputs through the real solver.
+_TRIVIAL_SHORTCUT = os.getenv("TRIVIAL_SOLVE_SHORTCUT", "1").lower() not in ("0", "false")
+
+# Route colors, assigned server-side per vehicle so the map page does a
+# table lookup instead of hashing every feature name client-side.
+_PALETTE = (
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+)
+
+
+def _vehicle_colors(vehicles: List[Vehicle]) -> Dict[str, str]:
+    return {v.name: _PALETTE[i % len(_PALETTE)] for i, v in enumerate(vehicles)}
+
+
+# Arrivals are minutes-from-day-start; preformat two days' worth so the hot
+# formatting loops do a tuple subscript instead of f-string machinery.
+_HHMM = tuple(f"{m // 60:02d}:{m % 60:02d}" for m in range(48 * 60))
+
+
+def _hhmm(minutes: int) -> str:
+    return _HHMM[minutes] if 0 <= minutes < len(_HHMM) else f"{minutes // 60:02d}:{minutes % 60:02d}"
+
 
 def _clean_store_text(value: Optional[str]) -> str:
     if not value:
@@ -54,35 +144,44 @@ def _clean_store_text(value: Optional[str]) -> str:
     return text.strip()
 
 
-def _canonical_key(stops: List[Stop], vehicles: List[Vehicle]) -> str:
-    """Build a stable string key representing the inputs (order-sensitive)."""
-    def ser_stop(s: Stop) -> Dict[str, Any]:
-        return {
-            "name": s.name,
-            # round for stability against minor float formatting differences
-            "lat": round(float(s.lat), 6),
-            "lon": round(float(s.lon), 6),
-            "demand": int(s.demand),
-            "service_min": int(s.service_min),
-            "tw": list(s.tw) if s.tw else None,
-        }
-
-    def ser_vehicle(v: Vehicle) -> Dict[str, Any]:
-        return {
-            "name": v.name,
-            "capacity": int(v.capacity),
-            "start_index": int(v.start_index),
-            "end_index": (int(v.end_index) if v.end_index is not None else None),
-            "max_route_min": (int(v.max_route_min) if v.max_route_min is not None else None),
-            # keep a reasonable precision for stability
-            "speed_factor": float(f"{float(v.speed_factor):.3f}"),
-        }
-
-    canon = {
-        "stops": [ser_stop(s) for s in stops],
-        "vehicles": [ser_vehicle(v) for v in vehicles],
-    }
-    return json.dumps(canon, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+def _canonical_key(stops: List[Stop], vehicles: List[Vehicle]) -> int:
+    """Hash the solve-relevant inputs into a stable 64-bit key (order-sensitive).
+
+    Streams struct-packed fields through xxh3 instead of materializing a
+    sorted JSON document; the digest is only ever compared against the
+    cached _LAST_SOLVE key. Stop/vehicle names are deliberately excluded:
+    they are display labels that don't affect the solution, so editing one
+    in the UI between solve and export keeps the cache warm.
+    """
+    h = xxhash.xxh3_64()
+
+    for s in stops:
+        # round for stability against minor float formatting differences
+        tw = s.tw if s.tw else (-1, -1)
+        h.update(
+            _PACK_STOP(
+                round(float(s.lat), 6),
+                round(float(s.lon), 6),
+                int(s.demand),
+                int(s.service_min),
+                int(tw[0]),
+                int(tw[1]),
+            )
+        )
+
+    for v in vehicles:
+        h.update(
+            _PACK_VEHICLE(
+                int(v.capacity),
+                int(v.start_index),
+                (int(v.end_index) if v.end_index is not None else -1),
+                (int(v.max_route_min) if v.max_route_min is not None else -1),
+                # keep a reasonable precision for stability
+                round(float(v.speed_factor), 3),
+            )
+        )
+
+    return h.intdigest()
 
 
 def ensure_osrm_ready(max_attempts: int = 20, delay_sec: float = 3.0) -> bool:
@@ -90,7 +189,7 @@ def ensure_osrm_ready(max_attempts: int = 20, delay_sec: float = 3.0) -> bool:
     probe = f"{OSRM_BASE}/nearest/v1/driving/36.3,33.5?number=1"
     for _ in range(max_attempts):
         try:
-            resp = requests.get(probe, timeout=2)
+            resp = _HTTP.get(probe, timeout=2)
             if resp.status_code < 500:
                 return True
         except requests.RequestException:
@@ -189,33 +288,181 @@ def _parse_vehicle(raw: Dict[str, Any], idx: int, *, default_capacity: int) -> V
     )
 
 
+@lru_cache(maxsize=4096)
+def _parse_stop_memo(frozen: tuple, idx: int, is_depot: bool) -> Stop:
+    return _parse_stop(dict(frozen), idx, is_depot=is_depot)
+
+
+@lru_cache(maxsize=4096)
+def _parse_vehicle_memo(frozen: tuple, idx: int, default_capacity: int) -> Vehicle:
+    return _parse_vehicle(dict(frozen), idx, default_capacity=default_capacity)
+
+
+def _parse_stops(raw_stops: List[Dict[str, Any]]) -> List[Stop]:
+    """Parse stops, memoizing by payload so the solve-then-export flow
+    doesn't re-validate identical dicts on every call."""
+    stops = []
+    for idx, raw in enumerate(raw_stops):
+        try:
+            # the memoized call must sit inside the try: sorting only fails
+            # on unsortable keys, while a list/dict *value* raises TypeError
+            # from lru_cache hashing the frozen tuple
+            stops.append(_parse_stop_memo(tuple(sorted(raw.items())), idx, idx == 0))
+        except TypeError:
+            # unhashable value somewhere in the payload; parse directly
+            stops.append(_parse_stop(raw, idx, is_depot=(idx == 0)))
+    return stops
+
+
+def _parse_vehicles(raw_vehicles: List[Dict[str, Any]], default_capacity: int) -> List[Vehicle]:
+    vehicles = []
+    for idx, raw in enumerate(raw_vehicles):
+        try:
+            vehicles.append(_parse_vehicle_memo(tuple(sorted(raw.items())), idx, default_capacity))
+        except TypeError:
+            vehicles.append(_parse_vehicle(raw, idx, default_capacity=default_capacity))
+    return vehicles
+
+
+def _trivial_solve(stops: List[Stop], vehicles: List[Vehicle]):
+    """Solve the degenerate one-depot/one-delivery case without OSRM or
+    OR-Tools. Returns (data, routes, geojson) or None when the shape or
+    constraints don't fit (fall back to the real solver)."""
+    if len(stops) != 2 or len(vehicles) != 1:
+        return None
+    vehicle = vehicles[0]
+    stop = stops[1]
+    if vehicle.start_index != 0 or vehicle.end_index not in (None, 0):
+        return None
+    if stop.demand > vehicle.capacity:
+        return None
+
+    # Straight-line estimate at ~30 km/h urban average; good enough for a
+    # plan whose order is forced anyway.
+    meters = haversine_m(stops[0].lat, stops[0].lon, stop.lat, stop.lon)
+    drive = int(round(meters / 500.0 * max(vehicle.speed_factor, 0.01)))
+
+    arrival = drive
+    if stop.tw:
+        arrival = max(arrival, stop.tw[0])
+        if arrival > stop.tw[1]:
+            return None
+    finish = arrival + stop.service_min + drive
+    if vehicle.max_route_min and finish > vehicle.max_route_min:
+        return None
+
+    default_tw = (0, 24 * 60)
+    data = {
+        "duration_matrix_min": np.array([[0, drive], [drive, 0]], dtype=np.int16),
+        "distance_matrix_m": np.array([[0, round(meters)], [round(meters), 0]], dtype=np.int32),
+        "demands": [s.demand for s in stops],
+        "service_min": [s.service_min for s in stops],
+        "time_windows": [s.tw if s.tw else default_tw for s in stops],
+        "vehicle_capacities": [vehicle.capacity],
+        "vehicle_starts": [0],
+        "vehicle_ends": [0],
+        "vehicle_max_route_min": [vehicle.max_route_min or 24 * 60],
+        "stops": stops,
+        "stops_soa": Stops.from_stops(stops),
+        "vehicles": vehicles,
+    }
+    routes = [(0, [(0, 0), (1, arrival), (0, finish)])]
+    geojson = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [s.lon, s.lat]},
+                "properties": {"index": i, "name": s.name, "demand": s.demand},
+            }
+            for i, s in enumerate(stops)
+        ]
+        + [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "LineString",
+                    "coordinates": [
+                        [stops[0].lon, stops[0].lat],
+                        [stop.lon, stop.lat],
+                        [stops[0].lon, stops[0].lat],
+                    ],
+                },
+                "properties": {"vehicle": vehicle.name},
+            }
+        ],
+    }
+    return data, routes, geojson
+
+
+def _names_match(data: Dict[str, Any], stops: List[Stop], vehicles: List[Vehicle]) -> bool:
+    return all(a.name == b.name for a, b in zip(stops, data["stops"])) and all(
+        a.name == b.name for a, b in zip(vehicles, data["vehicles"])
+    )
+
+
+def _assignment_rows(routes, data) -> List[tuple]:
+    """Build the driver-assignment table rows (xlsx column order)."""
+    duration_matrix = np.asarray(data["duration_matrix_min"])
+    distance_matrix = np.asarray(data["distance_matrix_m"])
+    rows = []
+    for vehicle_index, plan in routes:
+        vehicle = data["vehicles"][vehicle_index]
+        load = 0
+        for order, (node, arrival) in enumerate(plan, start=1):
+            stop = data["stops"][node]
+            prev_node = plan[order - 2][0] if order > 1 else None
+            leg_minutes = int(duration_matrix[prev_node, node]) if prev_node is not None else 0
+            leg_distance = (float(distance_matrix[prev_node, node]) if prev_node is not None else 0.0) / 1000.0
+            load += stop.demand
+            rows.append(
+                (
+                    vehicle.name,
+                    order,
+                    node,
+                    stop.name,
+                    stop.lat,
+                    stop.lon,
+                    stop.demand,
+                    load,
+                    arrival,
+                    _hhmm(arrival),
+                    leg_minutes,
+                    round(leg_distance, 3),
+                )
+            )
+    return rows
+
+
 def _format_routes(routes, data) -> List[Dict[str, Any]]:
-    duration_matrix = data["duration_matrix_min"]
-    distance_matrix = data["distance_matrix_m"]
+    # One vectorized gather per route instead of scalar matrix indexing
+    # inside the stop loop. build_data_model already hands these over as
+    # int32/float32 ndarrays, so asarray is a no-copy view.
+    duration_matrix = np.asarray(data["duration_matrix_min"])
+    distance_matrix = np.asarray(data["distance_matrix_m"])
     formatted = []
     for vehicle_index, plan in routes:
         vehicle = data["vehicles"][vehicle_index]
         stops_out = []
-        total_drive_min = 0
-        total_distance_m = 0.0
-        prev_idx: Optional[int] = None
 
-        for node_idx, arrival in plan:
+        nodes = np.fromiter((n for n, _ in plan), dtype=np.int32, count=len(plan))
+        prev = nodes[:-1]
+        curr = nodes[1:]
+        legs_min = duration_matrix[prev, curr]
+        legs_m = distance_matrix[prev, curr]
+        total_drive_min = int(legs_min.sum())
+        total_distance_m = float(legs_m.sum())
+
+        for pos, (node_idx, arrival) in enumerate(plan):
             stop = data["stops"][node_idx]
             leg = None
-            if prev_idx is not None:
-                leg_minutes = duration_matrix[prev_idx][node_idx]
-                leg_distance = distance_matrix[prev_idx][node_idx]
+            if pos > 0:
                 leg = {
-                    "from_index": prev_idx,
+                    "from_index": int(prev[pos - 1]),
                     "to_index": node_idx,
-                    "drive_minutes": leg_minutes,
-                    "distance_m": leg_distance,
+                    "drive_minutes": int(legs_min[pos - 1]),
+                    "distance_m": float(legs_m[pos - 1]),
                 }
-                if leg_minutes:
-                    total_drive_min += leg_minutes
-                if leg_distance:
-                    total_distance_m += leg_distance
 
             stops_out.append(
                 {
@@ -224,14 +471,13 @@ def _format_routes(routes, data) -> List[Dict[str, Any]]:
                     "lat": stop.lat,
                     "lon": stop.lon,
                     "arrival_min": arrival,
-                    "arrival_hhmm": f"{arrival // 60:02d}:{arrival % 60:02d}",
+                    "arrival_hhmm": _hhmm(arrival),
                     "demand": stop.demand,
                     "service_min": stop.service_min,
                     "time_window": list(stop.tw) if stop.tw else None,
                     "leg": leg,
                 }
             )
-            prev_idx = node_idx
 
         formatted.append(
             {
@@ -266,10 +512,7 @@ def api_solve():
         return jsonify({"error": "At least one stop (including depot) is required"}), 400
 
     try:
-        stops = [
-            _parse_stop(raw, idx, is_depot=(idx == 0))
-            for idx, raw in enumerate(raw_stops)
-        ]
+        stops = _parse_stops(raw_stops)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
 
@@ -283,10 +526,7 @@ def api_solve():
         if not isinstance(raw_vehicles, list):
             return jsonify({"error": "vehicles must be a list"}), 400
         try:
-            vehicles = [
-                _parse_vehicle(raw, idx, default_capacity=max(total_demand, 1))
-                for idx, raw in enumerate(raw_vehicles)
-            ]
+            vehicles = _parse_vehicles(raw_vehicles, max(total_demand, 1))
         except ValueError as exc:
             return jsonify({"error": str(exc)}), 400
     else:
@@ -304,6 +544,34 @@ def api_solve():
     if any(v.end_index is not None and (v.end_index >= len(stops) or v.end_index < 0) for v in vehicles):
         return jsonify({"error": "Vehicle end_index out of range"}), 400
 
+    if _TRIVIAL_SHORTCUT:
+        trivial = _trivial_solve(stops, vehicles)
+        if trivial is not None:
+            data, routes, geojson = trivial
+            formatted_routes = _format_routes(routes, data)
+            meta = {
+                "stops": len(stops),
+                "vehicles": len(vehicles),
+                "build_ms": 0.0,
+                "solve_ms": 0.0,
+                "trivial": True,
+            }
+            global _LAST_SOLVE
+            try:
+                _LAST_SOLVE = SolveBundle(
+                    key=_canonical_key(stops, vehicles),
+                    routes=routes,
+                    formatted_routes=formatted_routes,
+                    data=data,
+                    geojson=geojson,
+                    meta=meta,
+                    rows=_assignment_rows(routes, data),
+                    color_map=_vehicle_colors(vehicles),
+                )
+            except Exception:
+                pass
+            return jsonify({"routes": formatted_routes, "geojson": geojson, "meta": meta})
+
     if not ensure_osrm_ready():
         return (
             jsonify({"error": "OSRM backend is starting up. Please retry in a moment."}),
@@ -312,7 +580,7 @@ def api_solve():
 
     try:
         build_start = time.perf_counter()
-        data = build_data_model(stops, vehicles)
+        data = build_data_model(stops, vehicles, session=_HTTP)
         build_ms = (time.perf_counter() - build_start) * 1000.0
     except requests.RequestException as exc:
         return (
@@ -326,18 +594,17 @@ def api_solve():
         )
 
     solve_start = time.perf_counter()
-    routing, solution, time_dim, manager = solve_vrp(data)
+    routes = _solve_pool().submit(solve_and_extract, data).result()
     solve_ms = (time.perf_counter() - solve_start) * 1000.0
 
-    if solution is None:
+    if routes is None:
         return jsonify({"error": "No feasible solution found"}), 422
 
-    routes = get_routes(routing, solution, time_dim, data, manager)
     formatted_routes = _format_routes(routes, data)
 
     geojson: Optional[Dict[str, Any]]
     try:
-        geojson = to_geojson(routes, data)
+        geojson = to_geojson(routes, data, session=_HTTP)
     except requests.RequestException:
         # If polylines fail we still return a result; the frontend will degrade gracefully.
         geojson = None
@@ -349,17 +616,20 @@ def api_solve():
         "solve_ms": round(solve_ms, 1),
     }
 
-    # Cache the latest successful solve for reuse in export endpoints
-    global _LAST_SOLVE
+    # Cache the latest successful solve for reuse in export endpoints.
+    # Assignment rows are materialized eagerly so a cache-hit export is
+    # serialization-only.
     try:
-        _LAST_SOLVE = {
-            "key": _canonical_key(stops, vehicles),
-            "routes": routes,
-            "formatted_routes": formatted_routes,
-            "data": data,
-            "geojson": geojson,
-            "meta": meta,
-        }
+        _LAST_SOLVE = SolveBundle(
+            key=_canonical_key(stops, vehicles),
+            routes=routes,
+            formatted_routes=formatted_routes,
+            data=data,
+            geojson=geojson,
+            meta=meta,
+            rows=_assignment_rows(routes, data),
+            color_map=_vehicle_colors(vehicles),
+        )
     except Exception:
         # Never fail the response due to caching issues
         pass
@@ -457,7 +727,7 @@ def map_latest():
     Requires that /api/solve has been called successfully at least once.
     """
     global _LAST_SOLVE
-    if not _LAST_SOLVE or not _LAST_SOLVE.get("geojson"):
+    if not _LAST_SOLVE or not _LAST_SOLVE.geojson:
         return (
             "<html><body style='font-family:sans-serif;padding:1rem'>"
             "No solved routes available. Solve a plan first."
@@ -466,10 +736,22 @@ def map_latest():
             {"Content-Type": "text/html; charset=utf-8"},
         )
 
-    gj = _LAST_SOLVE["geojson"]
-    # Inline minimal page with Leaflet and the cached GeoJSON
-    gj_json = json.dumps(gj, ensure_ascii=False)
-    html = f"""<!DOCTYPE html>
+    # Render once per solve; repeat GETs (dashboard polling) serve the
+    # cached bytes without re-serializing the geojson.
+    cached = _LAST_SOLVE.map_html
+    if cached is None:
+        cached = _render_map_html(
+            _LAST_SOLVE.geojson, _LAST_SOLVE.color_map or {}
+        ).encode("utf-8")
+        _LAST_SOLVE.map_html = cached
+    return cached, 200, {"Content-Type": "text/html; charset=utf-8"}
+
+
+def _render_map_html(gj: Dict[str, Any], color_map: Dict[str, str]) -> str:
+    """Inline minimal page with Leaflet and the solved GeoJSON."""
+    gj_json = orjson.dumps(gj).decode()
+    colors_json = orjson.dumps(color_map).decode()
+    return f"""<!DOCTYPE html>
 <html lang=\"en\">
   <head>
     <meta charset=\"utf-8\" />
@@ -488,13 +770,9 @@ def map_latest():
         attribution: '&copy; OpenStreetMap contributors'
       }}).addTo(map);
 
-      // Deterministic color per vehicle name
-      const palette = ['#1f77b4','#ff7f0e','#2ca02c','#d62728','#9467bd','#8c564b','#e377c2','#7f7f7f','#bcbd22','#17becf'];
-      const colorFor = (name) => {{
-        let h = 0; const s = String(name || '');
-        for (let i = 0; i < s.length; i++) h = (h * 31 + s.charCodeAt(i)) | 0;
-        return palette[Math.abs(h) % palette.length];
-      }};
+      // Server-assigned color per vehicle name
+      const colorTable = {colors_json};
+      const colorFor = (name) => colorTable[name] || '#888';
 
       const layer = L.geoJSON(geojson, {{
         pointToLayer: function(feature, latlng) {{
@@ -528,7 +806,6 @@ def map_latest():
     </script>
   </body>
 </html>"""
-    return html, 200, {"Content-Type": "text/html; charset=utf-8"}
 
 
 @app.route("/api/export/assignments", methods=["POST"])
@@ -542,10 +819,7 @@ def api_export_assignments():
         return jsonify({"error": "At least one stop (including depot) is required"}), 400
 
     try:
-        stops = [
-            _parse_stop(raw, idx, is_depot=(idx == 0))
-            for idx, raw in enumerate(raw_stops)
-        ]
+        stops = _parse_stops(raw_stops)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
 
@@ -553,10 +827,7 @@ def api_export_assignments():
     raw_vehicles = payload.get("vehicles")
     if raw_vehicles:
         try:
-            vehicles = [
-                _parse_vehicle(raw, idx, default_capacity=max(total_demand, 1))
-                for idx, raw in enumerate(raw_vehicles)
-            ]
+            vehicles = _parse_vehicles(raw_vehicles, max(total_demand, 1))
         except ValueError as exc:
             return jsonify({"error": str(exc)}), 400
     else:
@@ -569,13 +840,19 @@ def api_export_assignments():
         ]
 
     # Try to reuse last solve if inputs match; otherwise compute fresh
-    use_cached = False
     global _LAST_SOLVE
     key = _canonical_key(stops, vehicles)
-    if _LAST_SOLVE and _LAST_SOLVE.get("key") == key:
-        data = _LAST_SOLVE["data"]
-        routes = _LAST_SOLVE["routes"]
-        use_cached = True
+    rows: Optional[List[tuple]] = None
+    if _LAST_SOLVE and _LAST_SOLVE.key == key:
+        if _names_match(_LAST_SOLVE.data, stops, vehicles) and _LAST_SOLVE.rows is not None:
+            rows = _LAST_SOLVE.rows
+        else:
+            # Names are excluded from the key (cosmetic); overlay the
+            # current labels onto a shallow copy of the cached model.
+            data = dict(_LAST_SOLVE.data)
+            data["stops"] = stops
+            data["vehicles"] = vehicles
+            rows = _assignment_rows(_LAST_SOLVE.routes, data)
     else:
         if not ensure_osrm_ready():
             return (
@@ -584,74 +861,108 @@ def api_export_assignments():
             )
 
         try:
-            data = build_data_model(stops, vehicles)
-            routing, solution, time_dim, manager = solve_vrp(data)
+            data = build_data_model(stops, vehicles, session=_HTTP)
+            routes = _solve_pool().submit(solve_and_extract, data).result()
         except requests.RequestException as exc:
             return jsonify({"error": "Failed to reach OSRM backend", "details": str(exc)}), 503
 
-        if solution is None:
+        if routes is None:
             return jsonify({"error": "No feasible solution found"}), 422
 
-        routes = get_routes(routing, solution, time_dim, data, manager)
+        rows = _assignment_rows(routes, data)
         # Update cache since we computed a fresh solution
         try:
-            _LAST_SOLVE = {
-                "key": key,
-                "routes": routes,
-                "formatted_routes": _format_routes(routes, data),
-                "data": data,
-                "geojson": None,
-                "meta": None,
-            }
+            _LAST_SOLVE = SolveBundle(
+                key=key,
+                routes=routes,
+                formatted_routes=_format_routes(routes, data),
+                data=data,
+                geojson=None,
+                meta=None,
+                rows=rows,
+                color_map=_vehicle_colors(vehicles),
+            )
         except Exception:
             pass
 
-    duration_matrix = data["duration_matrix_min"]
-    distance_matrix = data["distance_matrix_m"]
-    rows = []
-    for vehicle_index, plan in routes:
-        vehicle = data["vehicles"][vehicle_index]
-        load = 0
-        for order, (node, arrival) in enumerate(plan, start=1):
-            stop = data["stops"][node]
-            prev_node = plan[order - 2][0] if order > 1 else None
-            leg_minutes = duration_matrix[prev_node][node] if prev_node is not None else 0
-            leg_distance = (distance_matrix[prev_node][node] if prev_node is not None else 0.0) / 1000.0
-            load += stop.demand
-            rows.append(
-                {
-                    "Driver": vehicle.name,
-                    "Sequence": order,
-                    "Stop Index": node,
-                    "Stop Name": stop.name,
-                    "Latitude": stop.lat,
-                    "Longitude": stop.lon,
-                    "Demand": stop.demand,
-                    "Cumulative Demand": load,
-                    "ETA (minutes)": arrival,
-                    "ETA (HH:MM)": f"{arrival // 60:02d}:{arrival % 60:02d}",
-                    "Leg Minutes": leg_minutes or 0,
-                    "Leg Distance (km)": round(leg_distance or 0.0, 3),
-                }
-            )
-
     if not rows:
         return jsonify({"error": "No routes to export"}), 400
 
-    df = pd.DataFrame(rows)
-    df.sort_values(["Driver", "Sequence"], inplace=True)
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Assignments")
+    # Stream the precomputed rows straight into the workbook; they are
+    # already in (Driver, Sequence) order. Spool to disk past 8 MB so big
+    # exports don't spike RSS.
+    buf = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    # no in_memory here: xlsxwriter silently disables constant_memory when
+    # both are set, and constant_memory's row streaming is the point —
+    # its worksheet temp files are fine alongside the spooled buffer
+    wb = xlsxwriter.Workbook(buf, {"constant_memory": True})
+    ws = wb.add_worksheet("Assignments")
+    ws.write_row(
+        0,
+        0,
+        (
+            "Driver",
+            "Sequence",
+            "Stop Index",
+            "Stop Name",
+            "Latitude",
+            "Longitude",
+            "Demand",
+            "Cumulative Demand",
+            "ETA (minutes)",
+            "ETA (HH:MM)",
+            "Leg Minutes",
+            "Leg Distance (km)",
+        ),
+    )
+    for row_idx, row in enumerate(rows, start=1):
+        ws.write_row(row_idx, 0, row)
+    wb.close()
+
     buf.seek(0)
     return send_file(
         buf,
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         as_attachment=True,
         download_name="driver_assignments.xlsx",
+        conditional=True,
     )
 
 
+# Prebuilt KML skeletons; filled with %-formatting and str.join so long
+# polylines avoid repeated f-string/concat allocations.
+_KML_PLACEMARK = """<Placemark>
+      <name>%02d - %s</name>
+      <description>ETA %s, Demand %d</description>
+      <Point>
+        <coordinates>%.6f,%.6f,0</coordinates>
+      </Point>
+    </Placemark>"""
+
+_KML_DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+  <Document>
+    <name>%(vehicle)s Route</name>
+    <Placemark>
+      <name>%(vehicle)s Path</name>
+      <Style>
+        <LineStyle>
+          <color>ff0055ff</color>
+          <width>4</width>
+        </LineStyle>
+      </Style>
+      <LineString>
+        <tessellate>1</tessellate>
+        <coordinates>
+          %(coords)s
+        </coordinates>
+      </LineString>
+    </Placemark>
+    %(placemarks)s
+  </Document>
+</kml>"""
+
+
 @app.route("/api/export/kmlzip", methods=["POST"])
 def api_export_kmlzip():
     payload = request.get_json(force=True, silent=True)
@@ -663,10 +974,7 @@ def api_export_kmlzip():
         return jsonify({"error": "At least one stop (including depot) is required"}), 400
 
     try:
-        stops = [
-            _parse_stop(raw, idx, is_depot=(idx == 0))
-            for idx, raw in enumerate(raw_stops)
-        ]
+        stops = _parse_stops(raw_stops)
     except ValueError as exc:
         return jsonify({"error": str(exc)}), 400
 
@@ -674,10 +982,7 @@ def api_export_kmlzip():
     raw_vehicles = payload.get("vehicles")
     if raw_vehicles:
         try:
-            vehicles = [
-                _parse_vehicle(raw, idx, default_capacity=max(total_demand, 1))
-                for idx, raw in enumerate(raw_vehicles)
-            ]
+            vehicles = _parse_vehicles(raw_vehicles, max(total_demand, 1))
         except ValueError as exc:
             return jsonify({"error": str(exc)}), 400
     else:
@@ -693,10 +998,32 @@ def api_export_kmlzip():
     global _LAST_SOLVE
     key = _canonical_key(stops, vehicles)
     gj = None
-    if _LAST_SOLVE and _LAST_SOLVE.get("key") == key:
-        data = _LAST_SOLVE["data"]
-        routes = _LAST_SOLVE["routes"]
-        gj = _LAST_SOLVE.get("geojson")
+    if _LAST_SOLVE and _LAST_SOLVE.key == key:
+        # Overlay current display names (excluded from the key) onto a
+        # shallow copy of the cached model.
+        data = dict(_LAST_SOLVE.data)
+        data["stops"] = stops
+        # names live in the SoA too, so rebuild it for the relabelled view
+        data["stops_soa"] = Stops.from_stops(stops)
+        data["vehicles"] = vehicles
+        routes = _LAST_SOLVE.routes
+        gj = _LAST_SOLVE.geojson
+        if gj is not None:
+            # Line features were emitted in route order; relabel them in
+            # case vehicle names were edited since the solve.
+            lines = [
+                f for f in gj.get("features", [])
+                if f.get("geometry", {}).get("type") == "LineString"
+            ]
+            relabelled = False
+            for f, (vi, _) in zip(lines, routes):
+                props = f.setdefault("properties", {})
+                if props.get("vehicle") != data["vehicles"][vi].name:
+                    props["vehicle"] = data["vehicles"][vi].name
+                    relabelled = True
+            if relabelled:
+                # the cached map HTML was rendered from the old labels
+                _LAST_SOLVE.map_html = None
     else:
         if not ensure_osrm_ready():
             return (
@@ -705,29 +1032,31 @@ def api_export_kmlzip():
             )
 
         try:
-            data = build_data_model(stops, vehicles)
-            routing, solution, time_dim, manager = solve_vrp(data)
+            data = build_data_model(stops, vehicles, session=_HTTP)
+            routes = _solve_pool().submit(solve_and_extract, data).result()
         except requests.RequestException as exc:
             return jsonify({"error": "Failed to reach OSRM backend", "details": str(exc)}), 503
 
-        if solution is None:
+        if routes is None:
             return jsonify({"error": "No feasible solution found"}), 422
 
-        routes = get_routes(routing, solution, time_dim, data, manager)
-
     if gj is None:
         try:
-            gj = to_geojson(routes, data)
+            gj = to_geojson(routes, data, session=_HTTP)
             # store geojson in cache for future reuse
-            if _LAST_SOLVE and _LAST_SOLVE.get("key") == key:
-                _LAST_SOLVE["geojson"] = gj
+            if _LAST_SOLVE and _LAST_SOLVE.key == key:
+                _LAST_SOLVE.geojson = gj
+                _LAST_SOLVE.map_html = None
         except requests.RequestException as exc:
             return jsonify({"error": "Failed to fetch route polylines", "details": str(exc)}), 502
 
     stops_list = data["stops"]
     plan_map = {data["vehicles"][vi].name: plan for vi, plan in routes}
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+    # Spool to disk past 8 MB so big exports don't spike RSS.
+    mem = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    # ZIP_STORED: the KML goes over HTTP where transport compression is
+    # negotiated anyway, so skip the deflate pass here.
+    with zipfile.ZipFile(mem, mode="w", compression=zipfile.ZIP_STORED) as zf:
         for feature in gj.get("features", []):
             if feature.get("geometry", {}).get("type") != "LineString":
                 continue
@@ -735,48 +1064,22 @@ def api_export_kmlzip():
             coords = feature.get("geometry", {}).get("coordinates", [])
             plan = plan_map.get(vehicle_name, [])
 
-            coords_str = "\n          ".join(f"{lon},{lat},0" for lon, lat in coords)
-            placemark_points = []
-            for seq, (node, arrival) in enumerate(plan, start=1):
-                stop = stops_list[node]
-                placemark_points.append(
-                    f"""
-        <Placemark>
-          <name>{seq:02d} - {stop.name}</name>
-          <description>ETA {arrival // 60:02d}:{arrival % 60:02d}, Demand {stop.demand}</description>
-          <Point>
-            <coordinates>{stop.lon},{stop.lat},0</coordinates>
-          </Point>
-        </Placemark>
-        """.strip()
-                )
-            placemark_block = "\n    ".join(placemark_points)
-
-            kml_content = f"""<?xml version=\"1.0\" encoding=\"UTF-8\"?>
-<kml xmlns=\"http://www.opengis.net/kml/2.2\">
-  <Document>
-    <name>{vehicle_name} Route</name>
-    <Placemark>
-      <name>{vehicle_name} Path</name>
-      <Style>
-        <LineStyle>
-          <color>ff0055ff</color>
-          <width>4</width>
-        </LineStyle>
-      </Style>
-      <LineString>
-        <tessellate>1</tessellate>
-        <coordinates>
-          {coords_str}
-        </coordinates>
-      </LineString>
-    </Placemark>
-    {placemark_block}
-  </Document>
-</kml>
-"""
+            coords_str = "\n          ".join(
+                "%.6f,%.6f,0" % (lon, lat) for lon, lat in coords
+            )
+            placemark_block = "\n    ".join(
+                _KML_PLACEMARK
+                % (seq, stops_list[node].name, _hhmm(arrival), stops_list[node].demand,
+                   stops_list[node].lon, stops_list[node].lat)
+                for seq, (node, arrival) in enumerate(plan, start=1)
+            )
+            kml_content = _KML_DOCUMENT % {
+                "vehicle": vehicle_name,
+                "coords": coords_str,
+                "placemarks": placemark_block,
+            }
             fname = f"{slugify(vehicle_name)}.kml"
-            zf.writestr(fname, kml_content.strip())
+            zf.writestr(fname, kml_content)
 
     mem.seek(0)
     return send_file(
@@ -784,6 +1087,7 @@ def api_export_kmlzip():
         mimetype="application/zip",
         as_attachment=True,
         download_name="routes_kml.zip",
+        conditional=True,
     )
 
 
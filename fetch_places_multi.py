@@ -6,7 +6,9 @@ Aggregate places/POIs for Damascus (or any bbox) from multiple sources:
 - Overture Places (public S3 via DuckDB; optional)
 - AllThePlaces export (local NDJSON/NDJSON.gz; optional)
 
-Outputs CSV or GeoJSON compatible with /api/shops (fields: name, lat, lon, category...).
+Outputs CSV, GeoJSON, or newline-delimited GeoJSON (one Feature per line,
+streamable by line-oriented tools and DuckDB's read_json_auto) compatible
+with /api/shops (fields: name, lat, lon, category...).
 
 Examples:
   python fetch_places_multi.py --outfile shops_multi.geojson
@@ -20,16 +22,30 @@ import argparse
 import gzip
 import json
 import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Sequence, Tuple
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 try:
     import pandas as pd
 except ImportError as exc:  # pragma: no cover - env guard
     raise SystemExit("pandas is required. pip install pandas") from exc
 
+# Prefer ISA-L's SIMD-accelerated inflate for .gz dumps (2-4x faster than
+# stdlib zlib); fall back silently when python-isal isn't installed.
+try:
+    from isal import igzip_threaded  # type: ignore
+
+    _gzip_open = igzip_threaded.open
+except ImportError:
+    _gzip_open = gzip.open
+
 # Default bbox roughly covering Damascus
 DEFAULT_BBOX = (33.35, 36.15, 33.65, 36.45)  # south, west, north, east
 
@@ -39,12 +55,36 @@ except Exception as exc:  # pragma: no cover - import guard
     raise SystemExit(f"Unable to import fetch_shops helpers: {exc}")
 
 
-def _bbox_wkt(bbox: Tuple[float, float, float, float]) -> str:
-    south, west, north, east = bbox
-    return (
-        f"POLYGON(({west} {south}, {east} {south}, {east} {north}, "
-        f"{west} {north}, {west} {south}))"
-    )
+_DUCKDB_CON = None
+
+
+def _duck():
+    """Lazily create the one shared DuckDB connection.
+
+    Extension loads and S3 config are paid once per process, and the httpfs
+    metadata/object caches mean parquet footers fetched by one query are
+    reused by the next — the dominant cost of warm S3-backed reads. Callers
+    should run queries on a cursor() and never close the connection.
+    """
+    global _DUCKDB_CON
+    if _DUCKDB_CON is None:
+        import duckdb  # type: ignore
+
+        con = duckdb.connect()
+        con.execute(
+            "INSTALL httpfs; LOAD httpfs;"
+            "SET s3_region='us-west-2';"
+            "SET s3_endpoint='s3.amazonaws.com';"
+            "SET s3_url_style='path';"
+            "SET s3_use_ssl=true;"
+            "SET s3_access_key_id='';"
+            "SET s3_secret_access_key='';"
+            "SET s3_session_token='';"
+            "SET enable_http_metadata_cache=true;"
+            "SET enable_object_cache=true;"
+        )
+        _DUCKDB_CON = con
+    return _DUCKDB_CON
 
 
 def _grid_centers(bbox: Tuple[float, float, float, float], nx: int = 2, ny: int = 2) -> List[Tuple[float, float]]:
@@ -55,54 +95,249 @@ def _grid_centers(bbox: Tuple[float, float, float, float], nx: int = 2, ny: int
     return [(lat, lon) for lat in lats for lon in lons]
 
 
-def dedupe_places(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def _place_key(r: Dict[str, Any]) -> tuple | None:
+    """Exact-dedupe key: micro-degree fixed-point coords + normalized name."""
+    try:
+        # int keys hash faster and pack the seen set tighter than rounded
+        # floats, at ~11 cm precision
+        return (
+            int(float(r.get("lat", 0.0)) * 1_000_000),
+            int(float(r.get("lon", 0.0)) * 1_000_000),
+            str(r.get("name") or "").strip().lower(),
+        )
+    except Exception:
+        return None
+
+
+def _build_seen(rows: Iterable[Dict[str, Any]]) -> set:
     seen = set()
+    for r in rows:
+        key = _place_key(r)
+        if key is not None:
+            seen.add(key)
+    return seen
+
+
+def _dedupe_against(seen: set, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep rows whose key is unseen, updating seen in place."""
+    out: List[Dict[str, Any]] = []
+    for r in rows:
+        key = _place_key(r)
+        if key is None or key in seen:
+            continue
+        seen.add(key)
+        out.append(r)
+    return out
+
+
+def _dedupe_places_bloom(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]] | None:
+    """Memory-bounded dedupe via a scalable Bloom filter (~10 bits/key).
+
+    Keys flagged by the filter are dropped, so up to the configured 1% false-
+    positive rate of unique rows can be lost — the trade for keeping RSS flat
+    on multi-million-row global merges. Returns None if pybloom_live is
+    missing so the caller can fall back to the exact set.
+    """
+    try:
+        from pybloom_live import ScalableBloomFilter  # type: ignore
+    except ImportError:
+        return None
+    bloom = ScalableBloomFilter(initial_capacity=1_000_000, error_rate=0.01)
     uniq: List[Dict[str, Any]] = []
+    for r in rows:
+        key = _place_key(r)
+        # add() returns True when the key was (probably) already present
+        if key is None or bloom.add(key):
+            continue
+        uniq.append(r)
+    return uniq
+
+
+def _dedupe_places_near(rows: List[Dict[str, Any]], tolerance_m: float) -> List[Dict[str, Any]]:
+    """Drop rows within tolerance_m of a kept row whose name fuzzy-matches.
+
+    An R-tree keeps the candidate probe ~O(log N) per row, and RapidFuzz only
+    runs against the handful of spatial hits, so cross-source merges stay far
+    from the O(N^2) pairwise comparison.
+    """
+    from rtree import index  # type: ignore
+    from rapidfuzz import fuzz  # type: ignore
+
+    d = tolerance_m / 111_000.0  # degrees per meter, good enough at city scale
+    idx = index.Index()
+    uniq: List[Dict[str, Any]] = []
+    names: List[str] = []
     for r in rows:
         try:
-            lat_val = round(float(r.get("lat", 0.0)), 6)
-            lon_val = round(float(r.get("lon", 0.0)), 6)
+            lat = float(r.get("lat", 0.0))
+            lon = float(r.get("lon", 0.0))
         except Exception:
             continue
-        name_val = str(r.get("name") or "").strip().lower()
-        key = (lat_val, lon_val, name_val)
-        if key in seen:
+        name = str(r.get("name") or "").strip().lower()
+        dup = False
+        for hit in idx.intersection((lon - d, lat - d, lon + d, lat + d)):
+            other = names[hit]
+            if name == other or (name and other and fuzz.token_set_ratio(name, other) > 85):
+                dup = True
+                break
+        if dup:
             continue
-        seen.add(key)
+        idx.insert(len(uniq), (lon, lat, lon, lat))
+        names.append(name)
         uniq.append(r)
     return uniq
 
 
+def dedupe_places(
+    rows: Iterable[Dict[str, Any]], tolerance_m: float = 0.0, use_bloom: bool = False
+) -> List[Dict[str, Any]]:
+    rows = list(rows)
+    if tolerance_m > 0:
+        try:
+            return _dedupe_places_near(rows, tolerance_m)
+        except ImportError:
+            print(
+                "Warning: rtree/rapidfuzz not installed; "
+                "--merge-tolerance-m ignored, using exact dedupe."
+            )
+    if use_bloom:
+        uniq = _dedupe_places_bloom(rows)
+        if uniq is not None:
+            return uniq
+        print("Warning: pybloom_live not installed; --dedupe-bloom ignored, using exact dedupe.")
+    # Small inputs: the set-of-tuples scan beats DataFrame construction.
+    if len(rows) < 1000:
+        return _dedupe_against(set(), rows)
+
+    # Large inputs: rounding and hashing move into pandas/NumPy. Integer
+    # keys at 1e-6 precision match the _place_key tuples above.
+    df = pd.DataFrame(rows)
+    lat = pd.to_numeric(df.get("lat"), errors="coerce")
+    lon = pd.to_numeric(df.get("lon"), errors="coerce")
+    valid = lat.notna() & lon.notna()
+    name_key = df.get("name", pd.Series("", index=df.index)).fillna("").astype(str).str.strip().str.lower()
+    keys = pd.DataFrame(
+        {
+            "lat": (lat * 1e6).round().astype("Int64"),
+            "lon": (lon * 1e6).round().astype("Int64"),
+            "name": name_key,
+        }
+    )
+    keep = valid & ~keys.duplicated(keep="first")
+    return [rows[i] for i in keep.to_numpy().nonzero()[0]]
+
+
 def normalize_osm(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    norm: List[Dict[str, Any]] = []
-    for r in points:
-        norm.append(
-            {
-                "source": "osm",
-                "id": f"osm:{r.get('osm_type')}:{r.get('osm_id')}",
-                "name": r.get("name") or r.get("brand") or "",
-                "category": r.get("category"),
-                "lat": r.get("lat"),
-                "lon": r.get("lon"),
-                "addr_street": r.get("addr_street"),
-                "addr_housenumber": r.get("addr_housenumber"),
-                "addr_city": r.get("addr_city"),
-                "phone": r.get("phone"),
-                "website": r.get("website"),
-                "opening_hours": r.get("opening_hours"),
-            }
-        )
-    return norm
+    if not points:
+        return []
+    # Project/rename columns in pandas rather than building a dict per row;
+    # records only materialize once at the return boundary.
+    df = pd.DataFrame.from_records(points)
+    name = df.get("name", pd.Series("", index=df.index)).fillna("")
+    brand = df.get("brand", pd.Series("", index=df.index)).fillna("")
+    out = pd.DataFrame(
+        {
+            "source": "osm",
+            "id": "osm:" + df["osm_type"].astype(str) + ":" + df["osm_id"].astype(str),
+            "name": name.where(name.astype(bool), brand),
+            "category": df.get("category"),
+            "lat": df.get("lat"),
+            "lon": df.get("lon"),
+            "addr_street": df.get("addr_street"),
+            "addr_housenumber": df.get("addr_housenumber"),
+            "addr_city": df.get("addr_city"),
+            "phone": df.get("phone"),
+            "website": df.get("website"),
+            "opening_hours": df.get("opening_hours"),
+        }
+    )
+    return out.to_dict(orient="records")
 
 
-def fetch_osm(bbox: Tuple[float, float, float, float], area: str, amenities: Sequence[str], tags: Sequence[str]) -> List[Dict[str, Any]]:
+def fetch_osm(
+    bbox: Tuple[float, float, float, float],
+    area: str,
+    amenities: Sequence[str],
+    tags: Sequence[str],
+    cache_ttl: float | None = None,
+) -> List[Dict[str, Any]]:
     shop_regex = "|".join(tags)
     ql = build_overpass_query(area, bbox, shop_regex, list(amenities))
-    data = call_overpass(ql)
+    data = call_overpass(ql) if cache_ttl is None else call_overpass(ql, cache_ttl=cache_ttl)
     points = extract_points(data)
     return normalize_osm(points)
 
 
+# Column order of the tuples _fetch_foursquare_cell emits
+_FSQ_COLUMNS = ("id", "name", "category", "lat", "lon", "addr_street", "addr_city", "phone", "website")
+
+
+def _fetch_foursquare_cell(
+    session: requests.Session,
+    headers: Dict[str, str],
+    lat: float,
+    lon: float,
+    cats: str,
+    radius_m: int,
+    limit_per_cell: int,
+) -> List[tuple]:
+    """Page through one grid center; returns _FSQ_COLUMNS tuples (ids may repeat across cells)."""
+    url = "https://places-api.foursquare.com/places/search"
+    rows: List[tuple] = []
+    cursor = None
+    while True:
+        params = {
+            "ll": f"{lat},{lon}",
+            "radius": radius_m,
+            "categories": cats,
+            "limit": min(limit_per_cell, 50),
+        }
+        if cursor:
+            params["cursor"] = cursor
+        resp = session.get(url, headers=headers, params=params, timeout=12)
+        if resp.status_code == 429:
+            raise SystemExit("Foursquare rate-limited (429). Try later or reduce calls.")
+        if resp.status_code >= 400:
+            detail = (resp.text or "").strip()
+            raise SystemExit(
+                f"Foursquare error {resp.status_code}: {detail[:400] or 'no body'} | params={params}"
+            )
+        data = resp.json()
+        for place in data.get("results", []):
+            fsq_id = place.get("fsq_place_id") or place.get("fsq_id")
+            if not fsq_id:
+                continue
+            loc = place.get("location") or {}
+            # New API exposes latitude/longitude directly; fall back to location/geocodes for older responses.
+            lat_val = place.get("latitude") or loc.get("latitude")
+            lon_val = place.get("longitude") or loc.get("longitude")
+            if (lat_val is None or lon_val is None) and place.get("geocodes"):
+                main = (place.get("geocodes") or {}).get("main") or {}
+                lat_val = lat_val or main.get("latitude")
+                lon_val = lon_val or main.get("longitude")
+            cats_list = place.get("categories") or []
+            cat_name = cats_list[0].get("name") if cats_list else None
+            # tuples, not dicts: ~3x cheaper per result, one DataFrame at the end
+            rows.append(
+                (
+                    f"fsq:{fsq_id}",
+                    place.get("name") or "",
+                    cat_name,
+                    lat_val,
+                    lon_val,
+                    loc.get("address") or loc.get("street"),
+                    loc.get("locality"),
+                    place.get("tel") or place.get("telephone"),
+                    place.get("website"),
+                )
+            )
+            if len(rows) >= limit_per_cell:
+                return rows
+        cursor = data.get("context", {}).get("next_cursor")
+        if not cursor:
+            return rows
+
+
 def fetch_foursquare(
     bbox: Tuple[float, float, float, float],
     api_key: str,
@@ -122,72 +357,47 @@ def fetch_foursquare(
         "Accept": "application/json",
         "X-Places-Api-Version": api_version,
     }
-    # New host per migration guide
-    url = "https://places-api.foursquare.com/places/search"
     centers = _grid_centers(bbox, nx=grid[0], ny=grid[1])
-    rows: List[Dict[str, Any]] = []
-    seen_ids = set()
     cats = ",".join(categories)
 
-    for lat, lon in centers:
-        cursor = None
-        fetched = 0
-        while True:
-            params = {
-                "ll": f"{lat},{lon}",
-                "radius": radius_m,
-                "categories": cats,
-                "limit": min(limit_per_cell, 50),
-            }
-            if cursor:
-                params["cursor"] = cursor
-            resp = requests.get(url, headers=headers, params=params, timeout=12)
-            if resp.status_code == 429:
-                raise SystemExit("Foursquare rate-limited (429). Try later or reduce calls.")
-            if resp.status_code >= 400:
-                detail = (resp.text or "").strip()
-                raise SystemExit(
-                    f"Foursquare error {resp.status_code}: {detail[:400] or 'no body'} | params={params}"
-                )
-            data = resp.json()
-            for place in data.get("results", []):
-                fsq_id = place.get("fsq_place_id") or place.get("fsq_id")
-                if not fsq_id or fsq_id in seen_ids:
+    # One pooled session shared across cells: TCP/TLS handshakes happen once
+    # per connection, and transient 429/5xx get a backed-off retry instead of
+    # an immediate abort.
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=16,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=1.0,
+            status_forcelist=[429, 502, 503, 504],
+            allowed_methods=["GET"],
+        ),
+    )
+    session.mount("https://", adapter)
+
+    # The grid calls are latency-bound, so overlap them; dedupe by fsq id in
+    # the aggregation loop since adjacent cells overlap.
+    records: List[tuple] = []
+    seen_ids = set()
+    with ThreadPoolExecutor(max_workers=min(8, len(centers))) as ex:
+        cell_results = ex.map(
+            lambda c: _fetch_foursquare_cell(
+                session, headers, c[0], c[1], cats, radius_m, limit_per_cell
+            ),
+            centers,
+        )
+        for cell_rows in cell_results:
+            for t in cell_rows:
+                if t[0] in seen_ids:
                     continue
-                seen_ids.add(fsq_id)
-                loc = place.get("location") or {}
-                # New API exposes latitude/longitude directly; fall back to location/geocodes for older responses.
-                lat_val = place.get("latitude") or loc.get("latitude")
-                lon_val = place.get("longitude") or loc.get("longitude")
-                if (lat_val is None or lon_val is None) and place.get("geocodes"):
-                    main = (place.get("geocodes") or {}).get("main") or {}
-                    lat_val = lat_val or main.get("latitude")
-                    lon_val = lon_val or main.get("longitude")
-                cats_list = place.get("categories") or []
-                cat_name = cats_list[0].get("name") if cats_list else None
-                rows.append(
-                    {
-                        "source": "foursquare",
-                        "id": f"fsq:{fsq_id}",
-                        "name": place.get("name") or "",
-                        "category": cat_name,
-                        "lat": lat_val,
-                        "lon": lon_val,
-                        "addr_street": loc.get("address") or loc.get("street"),
-                        "addr_city": loc.get("locality"),
-                        "phone": (place.get("tel") or place.get("telephone")),
-                        "website": place.get("website"),
-                    }
-                )
-                fetched += 1
-                if fetched >= limit_per_cell:
-                    break
-            if fetched >= limit_per_cell:
-                break
-            cursor = data.get("context", {}).get("next_cursor")
-            if not cursor:
-                break
-    return rows
+                seen_ids.add(t[0])
+                records.append(t)
+    if not records:
+        return []
+    df = pd.DataFrame.from_records(records, columns=_FSQ_COLUMNS)
+    df.insert(0, "source", "foursquare")
+    return df.to_dict(orient="records")
 
 
 def fetch_overture(bbox: Tuple[float, float, float, float], release: str, limit: int) -> List[Dict[str, Any]]:
@@ -197,7 +407,7 @@ def fetch_overture(bbox: Tuple[float, float, float, float], release: str, limit:
         print("Skipping Overture: duckdb not installed (pip install duckdb).")
         return []
 
-    wkt = _bbox_wkt(bbox)
+    south, west, north, east = bbox
     sources = [
         ("s3", f"s3://overturemaps-us-west-2/release/{release}/theme=places/type=place/*"),
         ("s3-https", f"https://overturemaps-us-west-2.s3.amazonaws.com/release/{release}/theme=places/type=place/*"),
@@ -205,26 +415,14 @@ def fetch_overture(bbox: Tuple[float, float, float, float], release: str, limit:
         ("azure-blob", f"https://overturemapswestus2.blob.core.windows.net/release/{release}/theme=places/type=place/*"),
     ]
 
-    last_exc: Exception | None = None
-    for label, path in sources:
-        sql = f"""
-        INSTALL httpfs;
-        LOAD httpfs;
-        INSTALL spatial;
-        LOAD spatial;
-        SET s3_region='us-west-2';
-        SET s3_endpoint='s3.amazonaws.com';
-        SET s3_url_style='path';
-        SET s3_use_ssl=true;
-        SET s3_access_key_id='';
-        SET s3_secret_access_key='';
-        SET s3_session_token='';
+    def _source_sql(path: str) -> str:
+        return f"""
         SELECT
           id,
           COALESCE(names['primary'].value, names['common'].value, names['en'].value, '') AS name,
           COALESCE(list_element(categories, 1), '') AS category,
-          ST_Y(geometry) AS lat,
-          ST_X(geometry) AS lon,
+          bbox.ymin AS lat,
+          bbox.xmin AS lon,
           CASE
             WHEN array_length(addresses) > 0 THEN addresses[1].street
             ELSE NULL
@@ -242,23 +440,39 @@ def fetch_overture(bbox: Tuple[float, float, float, float], release: str, limit:
             ELSE NULL
           END AS phone
         FROM read_parquet('{path}', filename=true, hive_partitioning=1)
-        WHERE ST_Intersects(geometry, ST_GeomFromText('{wkt}', 4326))
+        -- scalar predicates on the GeoParquet bbox struct: parquet zone maps
+        -- prune whole row groups, which ST_Intersects on geometry cannot do.
+        -- Places are points, so bbox.xmin/ymin double as lon/lat above.
+        WHERE bbox.xmin <= {east} AND bbox.xmax >= {west}
+          AND bbox.ymin <= {north} AND bbox.ymax >= {south}
         LIMIT {limit};
         """
+
+    def _try_source(path: str):
+        cur = _duck().cursor()
         try:
-            con = duckdb.connect()
-            res = con.execute(sql).fetchall()
-            cols = [c[0] for c in con.description]
-            con.close()
-            break
-        except Exception as exc:
-            last_exc = exc
+            res = cur.execute(_source_sql(path)).fetchall()
+            return res, [c[0] for c in cur.description]
+        finally:
+            cur.close()
+
+    # Hedge the mirrors: fire all four concurrently and take the first one
+    # that answers, so an unreachable source costs nothing instead of its
+    # full timeout. Losers are abandoned (shutdown without waiting).
+    last_exc: Exception | None = None
+    res = cols = None
+    ex = ThreadPoolExecutor(max_workers=len(sources))
+    try:
+        futs = {ex.submit(_try_source, path): label for label, path in sources}
+        for fut in as_completed(futs):
             try:
-                con.close()
-            except Exception:
-                pass
-            continue
-    else:
+                res, cols = fut.result()
+                break
+            except Exception as exc:
+                last_exc = exc
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    if res is None:
         print(f"Warning: Overture query failed: {last_exc}")
         return []
 
@@ -282,22 +496,155 @@ def fetch_overture(bbox: Tuple[float, float, float, float], release: str, limit:
     return rows
 
 
-def fetch_alltheplaces(path: Path, bbox: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+def _atp_row(props: Dict[str, Any], lat: float, lon: float) -> Dict[str, Any]:
+    return {
+        "source": "alltheplaces",
+        "id": props.get("id") or props.get("@id") or "",
+        "name": props.get("name") or props.get("brand") or "",
+        "category": props.get("category") or props.get("type"),
+        "lat": lat,
+        "lon": lon,
+        "addr_street": props.get("addr:street") or props.get("street"),
+        "addr_city": props.get("addr:city") or props.get("city"),
+        "phone": props.get("phone"),
+        "website": props.get("website"),
+    }
+
+
+def _ensure_atp_parquet(path: Path, rebuild: bool = False) -> Path | None:
+    """One-time conversion of an AllThePlaces NDJSON(.gz) dump to Parquet.
+
+    The derived file is cached beside the source and reused while it is newer
+    than the dump (pass rebuild=True to force reclustering). Returns None when
+    duckdb is unavailable or the conversion fails, in which case callers fall
+    back to the Python line scan.
+    """
+    if path.suffix == ".parquet":
+        return path
+    try:
+        import duckdb  # type: ignore
+    except ImportError:
+        return None
+
+    derived = path.with_name(path.name + ".parquet")
+    if not rebuild and derived.exists() and derived.stat().st_mtime >= path.stat().st_mtime:
+        return derived
+
+    # lat/lon become real columns so bbox predicates push down to row-group
+    # min/max stats; properties stay as a JSON blob parsed only for matches.
+    # Hilbert-ordering the rows keeps each (small) row group spatially tight,
+    # so those stats actually prune city-sized queries instead of every group
+    # spanning the whole globe in insertion order.
+    select = f"""
+        SELECT
+            json_extract(geometry, '$.coordinates[1]')::DOUBLE AS lat,
+            json_extract(geometry, '$.coordinates[0]')::DOUBLE AS lon,
+            properties::JSON AS properties
+        FROM read_json_auto(
+            '{path}',
+            format='newline_delimited',
+            columns={{'geometry': 'JSON', 'properties': 'JSON'}},
+            ignore_errors=true
+        )
+        WHERE lat IS NOT NULL AND lon IS NOT NULL
+    """
+    hilbert_sql = f"""
+    INSTALL spatial;
+    LOAD spatial;
+    COPY (
+        {select}
+        ORDER BY ST_Hilbert(lon, lat, ST_Extent(ST_MakeEnvelope(-180, -90, 180, 90)))
+    ) TO '{derived}' (FORMAT PARQUET, ROW_GROUP_SIZE 8192);
+    """
+    plain_sql = f"""
+    COPY ({select}) TO '{derived}' (FORMAT PARQUET, ROW_GROUP_SIZE 50000);
+    """
+    for sql in (hilbert_sql, plain_sql):
+        try:
+            cur = _duck().cursor()
+            cur.execute(sql)
+            cur.close()
+            return derived
+        except Exception as exc:
+            last_exc = exc
+            try:
+                cur.close()
+            except Exception:
+                pass
+            derived.unlink(missing_ok=True)
+    print(f"Warning: parquet conversion of {path} failed ({last_exc}); using line scan.")
+    return None
+
+
+def _fetch_alltheplaces_parquet(
+    parquet: Path, bbox: Tuple[float, float, float, float], limit: int | None
+) -> List[Dict[str, Any]] | None:
+    try:
+        import duckdb  # type: ignore
+    except ImportError:
+        return None
+    s, w, n, e = bbox
+    sql = (
+        "SELECT lat, lon, properties FROM read_parquet(?) "
+        "WHERE lat BETWEEN ? AND ? AND lon BETWEEN ? AND ?"
+    )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    try:
+        cur = _duck().cursor()
+        res = cur.execute(sql, [str(parquet), s, n, w, e]).fetchall()
+        cur.close()
+    except Exception as exc:
+        print(f"Warning: parquet bbox query failed ({exc}); using line scan.")
+        try:
+            cur.close()
+        except Exception:
+            pass
+        return None
+    rows: List[Dict[str, Any]] = []
+    for lat, lon, props_json in res:
+        try:
+            props = orjson.loads(props_json) or {}
+        except orjson.JSONDecodeError:
+            props = {}
+        rows.append(_atp_row(props, lat, lon))
+    return rows
+
+
+def fetch_alltheplaces(
+    path: Path,
+    bbox: Tuple[float, float, float, float],
+    limit: int | None = None,
+    rebuild_parquet: bool = False,
+) -> List[Dict[str, Any]]:
     if not path.exists():
         print(f"Skipping AllThePlaces: {path} does not exist.")
         return []
 
-    opener = gzip.open if path.suffix == ".gz" else open
+    # Fast path: derived parquet + DuckDB predicate pushdown skips whole row
+    # groups whose lat/lon stats miss the bbox instead of decoding every line.
+    parquet = _ensure_atp_parquet(path, rebuild=rebuild_parquet)
+    if parquet is not None:
+        rows = _fetch_alltheplaces_parquet(parquet, bbox, limit)
+        if rows is not None:
+            return rows
+
+    opener = _gzip_open if path.suffix == ".gz" else open
     s, w, n, e = bbox
-    rows: List[Dict[str, Any]] = []
-    with opener(path, "rt", encoding="utf-8") as fh:
+    rows = []
+    # Binary stream + orjson: the C parser consumes bytes directly, so we
+    # skip both the utf-8 decode and the slower stdlib parse on every line.
+    with opener(path, "rb") as fh:
         for line in fh:
             line = line.strip()
             if not line:
                 continue
+            # cheap reject before parsing; usable features always carry coordinates
+            if b'"coordinates"' not in line:
+                continue
             try:
-                obj = json.loads(line)
-            except json.JSONDecodeError:
+                obj = orjson.loads(line)
+            except orjson.JSONDecodeError:
                 continue
             geom = obj.get("geometry") or {}
             coords = geom.get("coordinates") or []
@@ -306,21 +653,9 @@ def fetch_alltheplaces(path: Path, bbox: Tuple[float, float, float, float]) -> L
             lon, lat = coords[:2]
             if not (s <= lat <= n and w <= lon <= e):
                 continue
-            props = obj.get("properties") or {}
-            rows.append(
-                {
-                    "source": "alltheplaces",
-                    "id": props.get("id") or props.get("@id") or "",
-                    "name": props.get("name") or props.get("brand") or "",
-                    "category": props.get("category") or props.get("type"),
-                    "lat": lat,
-                    "lon": lon,
-                    "addr_street": props.get("addr:street") or props.get("street"),
-                    "addr_city": props.get("addr:city") or props.get("city"),
-                    "phone": props.get("phone"),
-                    "website": props.get("website"),
-                }
-            )
+            rows.append(_atp_row(obj.get("properties") or {}, lat, lon))
+            if limit and len(rows) >= limit:
+                break
     return rows
 
 
@@ -334,6 +669,25 @@ def _read_existing(outfile: Path, outfmt: str) -> List[Dict[str, Any]]:
         except Exception:
             print(f"Warning: failed to read existing CSV {outfile}; ignoring its contents.")
             return []
+    if outfmt == "geojsonl":
+        try:
+            rows = []
+            with outfile.open("rb") as fh:
+                for line in fh:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    f = orjson.loads(line)
+                    props = dict(f.get("properties") or {})
+                    coords = (f.get("geometry") or {}).get("coordinates") or []
+                    if len(coords) >= 2:
+                        props["lon"] = coords[0]
+                        props["lat"] = coords[1]
+                        rows.append(props)
+            return rows
+        except Exception:
+            print(f"Warning: failed to read existing GeoJSONL {outfile}; ignoring its contents.")
+            return []
     try:
         data = json.loads(outfile.read_text(encoding="utf-8"))
         feats = data.get("features", [])
@@ -353,40 +707,154 @@ def _read_existing(outfile: Path, outfmt: str) -> List[Dict[str, Any]]:
         return []
 
 
-def write_outputs(rows: List[Dict[str, Any]], outfmt: str, outfile: Path, mode: str) -> None:
+def _iter_features(rows: List[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+    """Yield GeoJSON Point features for rows with usable coordinates."""
+    if len(rows) >= 1000:
+        # Vectorized path: filter and split lat/lon column-wise, then
+        # materialize properties once, instead of copying every dict.
+        # Missing per-source fields become null properties (NaN -> null).
+        df = pd.DataFrame(rows).dropna(subset=["lat", "lon"])
+        lats = df.pop("lat").tolist()
+        lons = df.pop("lon").tolist()
+        for p, lo, la in zip(df.to_dict(orient="records"), lons, lats):
+            yield {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [lo, la]},
+                "properties": p,
+            }
+        return
+    for r in rows:
+        props = dict(r)
+        lat = props.pop("lat", None)
+        lon = props.pop("lon", None)
+        if lat is None or lon is None:
+            continue
+        yield {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": props,
+        }
+
+
+def _write_geojson_stream(fh, rows: List[Dict[str, Any]]) -> None:
+    fh.write(b'{"type":"FeatureCollection","features":[\n')
+    first = True
+    for feat in _iter_features(rows):
+        if not first:
+            fh.write(b",\n")
+        fh.write(orjson.dumps(feat))
+        first = False
+    fh.write(b"\n]}\n")
+
+
+def _append_rows(rows: List[Dict[str, Any]], outfmt: str, outfile: Path) -> None:
+    """Append rows without reparsing (or deduping against) the existing file."""
+    if outfmt == "csv":
+        pd.DataFrame(rows).to_csv(
+            outfile, mode="a", header=not outfile.exists(), index=False, encoding="utf-8-sig"
+        )
+        return
+    if outfmt == "geojsonl":
+        with outfile.open("ab") as fh:
+            for feat in _iter_features(rows):
+                fh.write(orjson.dumps(feat))
+                fh.write(b"\n")
+        return
+    if not outfile.exists():
+        with outfile.open("wb") as fh:
+            _write_geojson_stream(fh, rows)
+        return
+    # Splice into the FeatureCollection in place: truncate at the closing
+    # bracket of the features array and stream the new features after it.
+    with outfile.open("r+b") as fh:
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        tail_len = min(size, 64)
+        fh.seek(size - tail_len)
+        tail = fh.read(tail_len)
+        idx = tail.rfind(b"]")
+        if idx == -1:
+            raise SystemExit(f"{outfile} does not end like a FeatureCollection; cannot fresh-append.")
+        was_empty = tail[:idx].rstrip().endswith(b"[")
+        fh.seek(size - tail_len + idx)
+        fh.truncate()
+        first = was_empty
+        for feat in _iter_features(rows):
+            if not first:
+                fh.write(b",\n")
+            fh.write(orjson.dumps(feat))
+            first = False
+        fh.write(b"\n]}\n")
+
+
+def write_outputs(
+    rows: List[Dict[str, Any]], outfmt: str, outfile: Path, mode: str, tolerance_m: float = 0.0
+) -> None:
     outfmt = outfmt.lower()
     mode = mode.lower()
+    if mode == "fresh-append":
+        _append_rows(rows, outfmt, outfile)
+        print(f"Wrote {outfile} (+{len(rows)} rows, mode=fresh-append)")
+        return
     existing: List[Dict[str, Any]] = []
     if outfile.exists():
         if mode == "fail":
             raise SystemExit(f"{outfile} exists. Use --mode overwrite or append.")
-        existing = _read_existing(outfile, outfmt)
-
-    combined = dedupe_places(existing + rows) if mode in ("append", "merge", "dedupe") else rows
+        if mode in ("append", "merge", "dedupe"):
+            # only the merging modes need the old rows; overwrite would just
+            # throw the parse away
+            existing = _read_existing(outfile, outfmt)
+
+    sidecar = outfile.with_name(outfile.name + ".seen.pkl")
+    seen: set | None = None
+    if mode in ("append", "merge", "dedupe"):
+        if tolerance_m > 0:
+            combined = dedupe_places(existing + rows, tolerance_m=tolerance_m)
+        else:
+            # Incremental dedupe: reuse the persisted seen-set so an append
+            # costs O(new rows) instead of re-deduping the whole existing
+            # file. The sidecar is only trusted while at least as new as the
+            # output it describes; otherwise rebuild it from what we read.
+            if (
+                outfile.exists()
+                and sidecar.exists()
+                and sidecar.stat().st_mtime >= outfile.stat().st_mtime
+            ):
+                try:
+                    loaded = pickle.loads(sidecar.read_bytes())
+                    if isinstance(loaded, set):
+                        seen = loaded
+                except Exception:
+                    seen = None
+            if seen is None:
+                seen = _build_seen(existing)
+            combined = existing + _dedupe_against(seen, rows)
+    else:
+        combined = rows
 
     # Write atomically to avoid partial files
     tmp = outfile.with_suffix(outfile.suffix + ".tmp")
     if outfmt == "csv":
         df = pd.DataFrame(combined)
         df.to_csv(tmp, index=False, encoding="utf-8-sig")
+    elif outfmt == "geojsonl":
+        # one Feature per line: constant-memory for writers and readers alike
+        with tmp.open("wb") as fh:
+            for feat in _iter_features(combined):
+                fh.write(orjson.dumps(feat))
+                fh.write(b"\n")
     else:
-        features = []
-        for r in combined:
-            props = dict(r)
-            lat = props.pop("lat", None)
-            lon = props.pop("lon", None)
-            if lat is None or lon is None:
-                continue
-            features.append(
-                {
-                    "type": "Feature",
-                    "geometry": {"type": "Point", "coordinates": [lon, lat]},
-                    "properties": props,
-                }
-            )
-        gj = {"type": "FeatureCollection", "features": features}
-        tmp.write_text(json.dumps(gj, ensure_ascii=False, indent=2), encoding="utf-8")
+        # Stream features straight to disk: peak memory stays constant in the
+        # feature count instead of holding the feature list plus the whole
+        # encoded document. orjson still does the per-feature encode in C.
+        with tmp.open("wb") as fh:
+            _write_geojson_stream(fh, combined)
     tmp.replace(outfile)
+    if seen is not None:
+        try:
+            sidecar.write_bytes(pickle.dumps(seen))
+        except OSError:
+            pass  # the sidecar is an optimization only
     print(f"Wrote {outfile} ({len(combined)} rows, mode={mode})")
 
 
@@ -403,7 +871,7 @@ def parse_args() -> argparse.Namespace:
         default="osm",
         help="Comma-separated sources to include: osm,foursquare,overture,alltheplaces",
     )
-    p.add_argument("--out", choices=["csv", "geojson"], default="geojson", help="Output format")
+    p.add_argument("--out", choices=["csv", "geojson", "geojsonl"], default="geojson", help="Output format")
     p.add_argument("--outfile", default="shops_multi.geojson", help="Output file name")
     p.add_argument("--amenities", default="supermarket,cafe,restaurant", help="Amenity list for OSM (comma separated)")
     p.add_argument(
@@ -421,11 +889,38 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--overture-release", default="2025-12-17.0", help="Overture release ID")
     p.add_argument("--limit", type=int, default=5000, help="Row limit per source where applicable")
     p.add_argument("--alltheplaces", type=Path, default=None, help="Path to AllThePlaces NDJSON/NDJSON.gz export")
+    p.add_argument(
+        "--rebuild-parquet",
+        action="store_true",
+        help="Force re-deriving the Hilbert-clustered AllThePlaces parquet cache",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk Overpass response cache")
+    p.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=None,
+        help="Seconds to reuse cached Overpass responses (default: 6h)",
+    )
+    p.add_argument(
+        "--merge-tolerance-m",
+        type=float,
+        default=0.0,
+        help="Treat places within this many meters with similar names as duplicates "
+        "(0 = exact lat/lon/name dedupe only; needs rtree + rapidfuzz)",
+    )
+    p.add_argument(
+        "--dedupe-bloom",
+        action="store_true",
+        help="Dedupe through a Bloom filter (needs pybloom_live): flat memory for "
+        "multi-million-row runs, at the cost of ~1%% false-positive drops",
+    )
     p.add_argument(
         "--mode",
-        choices=["append", "overwrite", "fail"],
+        choices=["append", "fresh-append", "overwrite", "fail"],
         default="append",
-        help="Write mode: append (dedupe by lat/lon/name), overwrite, or fail if file exists (default: append)",
+        help="Write mode: append (dedupe by lat/lon/name), fresh-append (concatenate "
+        "without reparsing or deduping the existing file), overwrite, or fail if "
+        "file exists (default: append)",
     )
     return p.parse_args()
 
@@ -467,7 +962,8 @@ def main() -> None:
         tags = [t.strip() for t in args.tags.split(",") if t.strip()]
         amenities = [a.strip() for a in args.amenities.split(",") if a.strip()]
         print(f"Fetching OSM/Overpass for bbox {bbox} ...")
-        all_rows.extend(fetch_osm(bbox, args.area, amenities, tags))
+        cache_ttl = 0.0 if args.no_cache else args.cache_ttl
+        all_rows.extend(fetch_osm(bbox, args.area, amenities, tags, cache_ttl=cache_ttl))
 
     if "foursquare" in include:
         api_key = os.environ.get("FOURSQUARE_API_KEY", "")
@@ -490,12 +986,18 @@ def main() -> None:
 
     if "alltheplaces" in include and args.alltheplaces:
         print(f"Filtering AllThePlaces from {args.alltheplaces} ...")
-        all_rows.extend(fetch_alltheplaces(args.alltheplaces, bbox))
+        all_rows.extend(
+            fetch_alltheplaces(
+                args.alltheplaces, bbox, limit=args.limit, rebuild_parquet=args.rebuild_parquet
+            )
+        )
     elif "alltheplaces" in include:
         print("Skipping AllThePlaces: provide --alltheplaces path.")
 
-    all_rows = dedupe_places(all_rows)
-    write_outputs(all_rows, args.out, outfile, args.mode)
+    all_rows = dedupe_places(
+        all_rows, tolerance_m=args.merge_tolerance_m, use_bloom=args.dedupe_bloom
+    )
+    write_outputs(all_rows, args.out, outfile, args.mode, tolerance_m=args.merge_tolerance_m)
 
 
 if __name__ == "__main__":
@@ -19,19 +19,71 @@ by default and sets a User-Agent string; avoid frequent repeated calls.
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import re
 import sys
+import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 OVERPASS_ENDPOINTS = [
     "https://overpass-api.de/api/interpreter",
     "https://overpass.kumi.systems/api/interpreter",
 ]
 
+OVERPASS_CACHE_DIR = Path.home() / ".cache" / "damas_maps" / "overpass"
+OVERPASS_CACHE_TTL = 6 * 3600.0  # seconds; Overpass data is stable for hours
+
+# Shared session: keep-alive across endpoint failover, plus honored backoff
+# on 429/5xx so a rate limit gets a breather instead of an instant re-trip.
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=1.5,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=("POST",),
+        ),
+    ),
+)
+
+
+def _shop_filters(shop_regex: str, selector: str) -> str:
+    """Emit shop=* filters for a selector like '(s,w,n,e)' or '(area.searchArea)'.
+
+    Plain tag lists beyond a handful become exact key=value branches — hashed
+    index lookups on the Overpass side — instead of one alternation regex the
+    server scans over every shop element. Entries containing regex syntax
+    stay in the ~ form.
+    """
+    tags = [t for t in shop_regex.split("|") if t]
+    plain = [t for t in tags if re.fullmatch(r"[\w:-]+", t)]
+    lines = []
+    if len(plain) > 4:
+        for t in plain:
+            lines.append(f"  node[\"shop\"=\"{t}\"]{selector};")
+            lines.append(f"  way[\"shop\"=\"{t}\"]{selector};")
+            lines.append(f"  relation[\"shop\"=\"{t}\"]{selector};")
+        rest = [t for t in tags if t not in plain]
+    else:
+        rest = tags
+    if rest:
+        rx = "|".join(rest)
+        lines.append(f"  node[\"shop\"~\"{rx}\"]{selector};")
+        lines.append(f"  way[\"shop\"~\"{rx}\"]{selector};")
+        lines.append(f"  relation[\"shop\"~\"{rx}\"]{selector};")
+    return "\n".join(lines)
+
 
 def build_overpass_query(
     area_name: str,
@@ -51,9 +103,7 @@ def build_overpass_query(
         body = f"""
 (
 {amenity_filters}
-  node["shop"~"{shop_regex}"]({s},{w},{n},{e});
-  way["shop"~"{shop_regex}"]({s},{w},{n},{e});
-  relation["shop"~"{shop_regex}"]({s},{w},{n},{e});
+{_shop_filters(shop_regex, f"({s},{w},{n},{e})")}
 );
 out center qt;
 """.strip()
@@ -80,25 +130,42 @@ out center qt;
 {area_block}
 (
 {amenity_filters}
-  node["shop"~"{shop_regex}"](area.searchArea);
-  way["shop"~"{shop_regex}"](area.searchArea);
-  relation["shop"~"{shop_regex}"](area.searchArea);
+{_shop_filters(shop_regex, "(area.searchArea)")}
 );
 out center qt;
 """.strip()
     return header + body + "\n"
 
 
-def call_overpass(ql: str) -> Dict[str, Any]:
+def call_overpass(ql: str, cache_ttl: float = OVERPASS_CACHE_TTL) -> Dict[str, Any]:
+    # Content-addressed disk cache: identical queries within the TTL skip the
+    # network entirely, which is most of the wall time when iterating on
+    # output options. Pass cache_ttl <= 0 to bypass.
+    cache: Optional[Path] = None
+    if cache_ttl > 0:
+        key = hashlib.sha256(ql.encode("utf-8")).hexdigest()
+        cache = OVERPASS_CACHE_DIR / f"{key}.json"
+        if cache.exists() and time.time() - cache.stat().st_mtime < cache_ttl:
+            try:
+                return json.loads(cache.read_bytes())
+            except Exception:
+                pass  # corrupt/partial cache entry; refetch below
+
     headers = {"User-Agent": "damas-maps-fetch/1.0 (contact: local)"}
     last_exc: Optional[Exception] = None
     for url in OVERPASS_ENDPOINTS:
         try:
-            resp = requests.post(url, data=ql.encode("utf-8"), headers=headers, timeout=180)
+            resp = _SESSION.post(url, data=ql.encode("utf-8"), headers=headers, timeout=180)
             if resp.status_code == 429:
                 last_exc = RuntimeError(f"Overpass rate limited at {url} (429)")
                 continue
             resp.raise_for_status()
+            if cache is not None:
+                try:
+                    OVERPASS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                    cache.write_bytes(resp.content)
+                except OSError:
+                    pass  # cache is best-effort
             return resp.json()
         except Exception as exc:
             last_exc = exc
@@ -108,7 +175,14 @@ def call_overpass(ql: str) -> Dict[str, Any]:
 
 def extract_points(osm_json: Dict[str, Any]) -> List[Dict[str, Any]]:
     elements = osm_json.get("elements", [])
-    rows: List[Dict[str, Any]] = []
+    # Column accumulators: one DataFrame build at the end instead of a
+    # dict allocation per element, with the dedupe done in pandas.
+    cols: Dict[str, List[Any]] = {
+        "osm_type": [], "osm_id": [], "name": [], "category": [],
+        "source_tag": [], "brand": [], "lat": [], "lon": [],
+        "addr_street": [], "addr_housenumber": [], "addr_city": [],
+        "phone": [], "website": [], "opening_hours": [],
+    }
     for el in elements:
         etype = el.get("type")
         tags = el.get("tags", {})
@@ -122,45 +196,38 @@ def extract_points(osm_json: Dict[str, Any]) -> List[Dict[str, Any]]:
         if lat is None or lon is None:
             continue
 
-        name = tags.get("name:en") or tags.get("name") or tags.get("brand") or ""
         shop = tags.get("shop")
         amenity = tags.get("amenity")
-        brand = tags.get("brand")
-        street = tags.get("addr:street")
-        housenumber = tags.get("addr:housenumber")
-        city = tags.get("addr:city")
-        phone = tags.get("phone") or tags.get("contact:phone")
-        website = tags.get("website") or tags.get("contact:website")
-        opening_hours = tags.get("opening_hours")
-
-        rows.append(
-            {
-                "osm_type": etype,
-                "osm_id": el.get("id"),
-                "name": name,
-                "category": amenity or shop,
-                "source_tag": ("amenity" if amenity else ("shop" if shop else None)),
-                "brand": brand,
-                "lat": lat,
-                "lon": lon,
-                "addr_street": street,
-                "addr_housenumber": housenumber,
-                "addr_city": city,
-                "phone": phone,
-                "website": website,
-                "opening_hours": opening_hours,
-            }
-        )
-    # Deduplicate exact lat,lon,name triples
-    seen = set()
-    uniq: List[Dict[str, Any]] = []
-    for r in rows:
-        key = (round(r["lat"], 7), round(r["lon"], 7), (r["name"] or "").strip().lower())
-        if key in seen:
-            continue
-        seen.add(key)
-        uniq.append(r)
-    return uniq
+        cols["osm_type"].append(etype)
+        cols["osm_id"].append(el.get("id"))
+        cols["name"].append(tags.get("name:en") or tags.get("name") or tags.get("brand") or "")
+        cols["category"].append(amenity or shop)
+        cols["source_tag"].append("amenity" if amenity else ("shop" if shop else None))
+        cols["brand"].append(tags.get("brand"))
+        cols["lat"].append(lat)
+        cols["lon"].append(lon)
+        cols["addr_street"].append(tags.get("addr:street"))
+        cols["addr_housenumber"].append(tags.get("addr:housenumber"))
+        cols["addr_city"].append(tags.get("addr:city"))
+        cols["phone"].append(tags.get("phone") or tags.get("contact:phone"))
+        cols["website"].append(tags.get("website") or tags.get("contact:website"))
+        cols["opening_hours"].append(tags.get("opening_hours"))
+
+    df = pd.DataFrame(cols)
+    if df.empty:
+        return []
+
+    # Deduplicate exact lat,lon,name triples (vectorized; int keys at the
+    # same 1e-7 precision the old round(x, 7) tuples used)
+    lat_key = (pd.to_numeric(df["lat"], errors="coerce") * 1e7).round().astype("int64")
+    lon_key = (pd.to_numeric(df["lon"], errors="coerce") * 1e7).round().astype("int64")
+    name_key = df["name"].astype(str).str.strip().str.lower()
+    df = (
+        df.assign(_lat_key=lat_key, _lon_key=lon_key, _name_key=name_key)
+        .drop_duplicates(subset=["_lat_key", "_lon_key", "_name_key"], keep="first")
+        .drop(columns=["_lat_key", "_lon_key", "_name_key"])
+    )
+    return df.to_dict(orient="records")
 
 
 def to_geojson(points: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -254,12 +321,19 @@ def main():
     p.add_argument("--out", choices=["geojson", "csv"], default="geojson", help="Output format")
     p.add_argument("--outfile", default="damascus_shops.geojson", help="Output filename")
     p.add_argument("--map", dest="map_html", default=None, help="Optional Folium map HTML output path")
+    p.add_argument("--no-cache", action="store_true", help="Bypass the on-disk Overpass response cache")
+    p.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=OVERPASS_CACHE_TTL,
+        help="Seconds to reuse cached Overpass responses (default: 6h)",
+    )
     args = p.parse_args()
 
     shop_vals = "|".join(v.strip() for v in args.tags.split(",") if v.strip())
     amenities = [v.strip() for v in args.amenities.split(",") if v.strip()]
     ql = build_overpass_query(args.area, args.bbox, shop_vals, amenities)
-    data = call_overpass(ql)
+    data = call_overpass(ql, cache_ttl=0 if args.no_cache else args.cache_ttl)
     points = extract_points(data)
     if not points:
         print("No results found.")
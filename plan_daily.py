@@ -1,14 +1,17 @@
 #!/usr/bin/env python3
 import argparse
-import json
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+import orjson
+
 from solve_vrp import (
     Stop,
     Vehicle,
     build_data_model,
     solve_vrp,
+    solve_portfolio_parallel,
     get_routes,
     to_geojson,
     export_assignments_excel,
@@ -22,9 +25,51 @@ def parse_args():
     p.add_argument("--trucks", type=int, default=None, help="If vehicles not provided, number of trucks to create")
     p.add_argument("--capacity", type=int, default=None, help="If vehicles not provided, capacity per truck")
     p.add_argument("--prefix", default="daily", help="Filename prefix for outputs (default: daily)")
+    p.add_argument("--time-limit", type=int, default=20, help="Solver time budget in seconds (default: 20)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Parallel search workers (default: all cores, if the OR-Tools build supports it)")
+    p.add_argument("--granular-k", type=int, default=None,
+                   help="Restrict each stop's successors to its K nearest neighbors (default: off)")
+    p.add_argument("--kmz", action=argparse.BooleanOptionalAction, default=True,
+                   help="Write routes as one compressed .kmz (default) or loose .kml files (--no-kmz)")
+    p.add_argument("--warm-start", action=argparse.BooleanOptionalAction, default=True,
+                   help="Seed the solver from the previous run's plan if compatible (default: on)")
+    p.add_argument("--parallel-solves", type=int, default=None,
+                   help="Run N independent solver processes with varied seeds/strategies and keep the best plan")
+    p.add_argument("--pretty", action="store_true",
+                   help="Indent the GeoJSON output (larger and slower to write)")
+    p.add_argument("--drop-penalty", type=int, default=None,
+                   help="Allow dropping a stop at this cost (seconds) instead of failing an infeasible batch")
     return p.parse_args()
 
 
+def _load_batch(in_path: Path) -> Dict[str, Any]:
+    """
+    Load a daily batch file, dispatching on extension. JSON is the default
+    (parsed with orjson); .msgpack and .parquet are accepted for large
+    batches and need their optional packages installed. Parquet files are
+    row-per-location with the depot as the first row; vehicles then come
+    from --trucks/--capacity.
+    """
+    suffix = in_path.suffix.lower()
+    if suffix == ".msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise SystemExit("msgpack input requires the 'msgpack' package (pip install msgpack)")
+        return msgpack.unpackb(in_path.read_bytes(), raw=False)
+    if suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("parquet input requires the 'pyarrow' package (pip install pyarrow)")
+        rows = pq.read_table(in_path).to_pylist()
+        if not rows:
+            raise SystemExit("Parquet batch file is empty")
+        return {"depot": rows[0], "stops": rows[1:]}
+    return orjson.loads(in_path.read_bytes())
+
+
 def build_from_json(obj: Dict[str, Any], trucks: Optional[int], capacity: Optional[int]):
     # Depot
     depot = obj.get("depot") or {}
@@ -91,28 +136,72 @@ def build_from_json(obj: Dict[str, Any], trucks: Optional[int], capacity: Option
 def main():
     args = parse_args()
     in_path = Path(args.input)
-    obj = json.loads(in_path.read_text(encoding="utf-8"))
+    obj = _load_batch(in_path)
 
     stops, vehicles = build_from_json(obj, args.trucks, args.capacity)
+    prefix = args.prefix.rstrip("._-") or "daily"
+
+    # Seed from the previous run's plan when the batch still fits it; the
+    # solver falls back to a cold start if the routes no longer match.
+    ws_path = Path(f"{prefix}_warmstart.json")
+    initial_routes: Optional[List[List[int]]] = None
+    if args.warm_start and ws_path.exists():
+        try:
+            prev = orjson.loads(ws_path.read_bytes())
+            if all(0 < node < len(stops) for route in prev for node in route):
+                initial_routes = prev
+        except (orjson.JSONDecodeError, TypeError):
+            pass
 
     # Build/solve
     data = build_data_model(stops, vehicles)
-    routing, solution, time_dim, manager = solve_vrp(data)
-    if solution is None:
-        raise SystemExit("No solution found for this batch")
-
-    routes = get_routes(routing, solution, time_dim, data, manager)
+    if args.parallel_solves:
+        routes = solve_portfolio_parallel(
+            data, workers=args.parallel_solves, time_limit_s=args.time_limit
+        )
+        if routes is None:
+            raise SystemExit("No solution found for this batch")
+    else:
+        routing, solution, time_dim, manager = solve_vrp(
+            data, time_limit_s=args.time_limit, workers=args.workers,
+            granular_k=args.granular_k, initial_routes=initial_routes,
+            drop_penalty=args.drop_penalty
+        )
+        if solution is None:
+            raise SystemExit("No solution found for this batch")
+        routes = get_routes(routing, solution, time_dim, data, manager)
+
+    # Persist tomorrow's warm start: node visits per vehicle, depots stripped.
+    if args.warm_start:
+        try:
+            ws_path.write_bytes(orjson.dumps([[n for n, _ in plan][1:-1] for _, plan in routes]))
+        except OSError:
+            pass  # warm start is best-effort
+
+    # Outputs with custom prefix. The geometry fetch is network-bound and the
+    # Excel export is CPU-bound over the same read-only data, so overlap them;
+    # KML and the map need the geojson and run after it resolves.
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        gj_fut = ex.submit(to_geojson, routes, data)
+        xlsx_fut = ex.submit(
+            export_assignments_excel,
+            routes,
+            data,
+            data["duration_matrix_min"],
+            data["distance_matrix_m"],
+            outfile=f"{prefix}_assignments.xlsx",
+        )
+        gj = gj_fut.result()
+        xlsx_fut.result()
 
-    # Outputs with custom prefix
-    prefix = args.prefix.rstrip("._-") or "daily"
-    gj = to_geojson(routes, data)
     geo_path = f"{prefix}_routes.geojson"
-    Path(geo_path).write_text(json.dumps(gj, ensure_ascii=False, indent=2), encoding="utf-8")
+    # orjson encodes to utf-8 bytes in C, ~an order of magnitude faster than
+    # stdlib json for polyline-heavy route geometry; compact unless --pretty
+    Path(geo_path).write_bytes(
+        orjson.dumps(gj, option=orjson.OPT_INDENT_2 if args.pretty else 0))
     print(f"Wrote {geo_path}")
 
-    # Excel and KML (reusing helpers from solve_vrp)
-    export_assignments_excel(routes, data, data["duration_matrix_min"], data["distance_matrix_m"], outfile=f"{prefix}_assignments.xlsx")
-    export_routes_kml(gj, routes, data, folder=f"{prefix}_kml")
+    export_routes_kml(gj, routes, data, folder=f"{prefix}_kml", kmz=args.kmz)
 
     # Optional HTML map
     try:
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compiled kernels for offline route analytics (what-if scoring, reinsertion
+tests). These never touch the OR-Tools solve itself — they only make scoring
+many candidate paths against the cost matrices cheap.
+
+Numba is optional: when it is missing the kernels run as plain Python over
+numpy arrays, which is correct but slower.
+"""
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to the interpreted loop
+    def njit(*args, **kwargs):
+        def wrap(fn):
+            return fn
+        if args and callable(args[0]):
+            return args[0]
+        return wrap
+
+
+@njit(cache=True, fastmath=True)
+def route_cost(dur: np.ndarray, dist: np.ndarray, demand: np.ndarray,
+               path: np.ndarray) -> Tuple[int, float, int]:
+    """
+    Total duration (min), distance (m) and load for one node path, in a
+    single pass over contiguous arrays. cache=True persists the compiled
+    kernel so only the first-ever call pays the JIT cost.
+    """
+    total_dur = 0
+    total_dist = 0.0
+    total_load = 0
+    for i in range(path.shape[0]):
+        node = path[i]
+        total_load += demand[node]
+        if i > 0:
+            prev = path[i - 1]
+            total_dur += dur[prev, node]
+            total_dist += dist[prev, node]
+    return total_dur, total_dist, total_load
+
+
+def analyze_routes(routes, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Score solved routes (as returned by get_routes) against the data model's
+    matrices: per-vehicle travel minutes, meters and carried load.
+    """
+    dur = np.ascontiguousarray(data["duration_matrix_min"], dtype=np.int32)
+    dist = np.ascontiguousarray(data["distance_matrix_m"], dtype=np.float64)
+    demand = np.ascontiguousarray(data["demands"], dtype=np.int32)
+
+    out: List[Dict[str, Any]] = []
+    for vehicle_index, plan in routes:
+        path = np.fromiter((node for node, _ in plan), dtype=np.int32, count=len(plan))
+        total_dur, total_dist, total_load = route_cost(dur, dist, demand, path)
+        out.append({
+            "vehicle": vehicle_index,
+            "duration_min": int(total_dur),
+            "distance_m": float(total_dist),
+            "load": int(total_load),
+        })
+    return out